@@ -0,0 +1,337 @@
+import base64
+import gzip
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import orjson
+import requests
+from requests.adapters import HTTPAdapter
+from requests.auth import AuthBase
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger()
+
+ES_HOST = "http://elasticsearch:9200"
+ES_USER = "elastic"
+ES_PASSWORD = "changeme"
+INDEX_NAME = "flights"
+
+KIBANA_HOST = "http://kibana:5601"
+KIBANA_USER = "kibana_user_test"
+KIBANA_PASSWORD = "newpassword"
+KIBANA_DATAVIEW_ID = "flights"
+JSON_HEADERS = {"Content-Type": "application/json"}
+BULK_HEADERS = {"Content-Type": "application/x-ndjson", "Content-Encoding": "gzip"}
+AUTO_ID_ACTION = b'{"index":{}}\n'
+
+MAX_RETRY_WORKERS = 12
+RETRY_ROUNDS = 3
+RETRY_BACKOFF = 0.2
+BOOTSTRAP_TIMEOUT = 10
+
+class PrecomputedBasicAuth(AuthBase):
+    # Credentials are static, so the Authorization header is built once rather
+    # than re-encoded by HTTPBasicAuth on every request.
+    def __init__(self, username: str, password: str):
+        credentials = base64.b64encode(f"{username}:{password}".encode()).decode()
+        self.header = f"Basic {credentials}"
+
+    def __call__(self, r):
+        r.headers["Authorization"] = self.header
+        return r
+
+ES_AUTH = PrecomputedBasicAuth(ES_USER, ES_PASSWORD)
+KIBANA_AUTH = PrecomputedBasicAuth(KIBANA_USER, KIBANA_PASSWORD)
+KIBANA_HEADERS = {
+    "kbn-xsrf": "true",
+    "Content-Type": "application/json"
+}
+
+SESSION = requests.Session()
+# Session-level auth also stops requests from looking up ~/.netrc per request.
+SESSION.auth = ES_AUTH
+SESSION.mount(
+    "http://",
+    HTTPAdapter(
+        pool_connections=2,
+        pool_maxsize=32,
+        max_retries=Retry(total=2, read=False, backoff_factor=0.1)
+    )
+)
+
+INDEX_SETTINGS = {
+    "index.refresh_interval": "30s",
+    "index.translog.durability": "async",
+    "index.translog.flush_threshold_size": "1gb",
+    "index.number_of_replicas": 0
+}
+
+FLIGHT_MAPPING = {
+    "settings": INDEX_SETTINGS,
+    "mappings": {
+        "properties": {
+            "icao24": {"type": "keyword"},
+            "callsign": {"type": "keyword"},
+            "origin_country": {"type": "keyword"},
+            "on_ground": {"type": "boolean"},
+            "velocity_mps": {"type": "float"},
+            "true_track_deg": {"type": "float"},
+            "vertical_rate_mps": {"type": "float"},
+            "baro_altitude_m": {"type": "float"},
+            "geo_altitude_m": {"type": "float"},
+            "location": {"type": "geo_point"},
+            "last_contact": {"type": "date", "format": "epoch_second"}
+        }
+    }
+}
+
+DATA_VIEW = {
+    "data_view": {
+        "id": KIBANA_DATAVIEW_ID,
+        "title": INDEX_NAME,
+        "name": KIBANA_DATAVIEW_ID
+    }
+}
+
+# The bootstrap payloads never change, so they are encoded once at import.
+FLIGHT_MAPPING_BODY = orjson.dumps(FLIGHT_MAPPING)
+DATA_VIEW_BODY = orjson.dumps(DATA_VIEW)
+
+_index_created = False
+_data_view_created = False
+_bootstrap_done = threading.Event()
+
+def ensure_index_exists():
+    global _index_created
+    if _index_created:
+        return
+
+    index_url = f"{ES_HOST}/{INDEX_NAME}"
+
+    try:
+        create_response = SESSION.put(
+            index_url,
+            data=FLIGHT_MAPPING_BODY,
+            headers=JSON_HEADERS,
+            timeout=5
+        )
+
+        if (
+            create_response.status_code == 400
+            and "resource_already_exists_exception" in create_response.text
+        ):
+            logger.info(f"Index '{INDEX_NAME}' already exists.")
+        else:
+            create_response.raise_for_status()
+            logger.info(f"Successfully created index '{INDEX_NAME}' with mapping.")
+
+        _index_created = True
+
+    except requests.exceptions.ConnectionError as e:
+        logger.error(f"Cannot connect to Elasticsearch at {ES_HOST}. Is it running?")
+        raise Exception(f"Connection error: {e}")
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Error checking/creating index '{INDEX_NAME}': {e}")
+        raise Exception(f"Error checking/creating index: {e}")
+
+def ensure_data_view_exists():
+    global _data_view_created
+    if _data_view_created:
+        return
+
+    create_url = f"{KIBANA_HOST}/api/data_views/data_view"
+
+    try:
+        create_response = SESSION.post(
+            create_url,
+            headers=KIBANA_HEADERS,
+            auth=KIBANA_AUTH,
+            data=DATA_VIEW_BODY,
+            timeout=5
+        )
+
+        # Kibana reports an existing data view as 400 "Duplicate data view",
+        # not 409.
+        if create_response.status_code == 409 or (
+            create_response.status_code == 400
+            and "Duplicate data view" in create_response.text
+        ):
+            logger.info(f"Data view '{KIBANA_DATAVIEW_ID}' already exists.")
+        else:
+            create_response.raise_for_status()
+            logger.info(f"Successfully created data view '{KIBANA_DATAVIEW_ID}'.")
+
+        _data_view_created = True
+
+    except requests.exceptions.ConnectionError as e:
+        logger.warning(
+            f"Could not connect to Kibana at {KIBANA_HOST}. Data view not created. {e}"
+        )
+        _data_view_created = True
+    except requests.exceptions.RequestException as e:
+        detail = e.response.text if e.response is not None else e
+        logger.error(
+            f"Error checking/creating data view '{KIBANA_DATAVIEW_ID}': {detail}"
+        )
+        _data_view_created = True
+
+
+def _bootstrap():
+    try:
+        ensure_index_exists()
+    except Exception as e:
+        logger.warning(f"Bootstrap failed, retrying on invocation: {e}")
+    finally:
+        _bootstrap_done.set()
+
+    # The data view is only needed by Kibana, so it is created best-effort
+    # after the handler has been released and is never retried on invocation.
+    ensure_data_view_exists()
+
+# Inside the Lambda runtime the index and data view are set up while the
+# container initialises; elsewhere (tests, local runs) the handler creates
+# the index inline.
+if os.environ.get("AWS_LAMBDA_FUNCTION_NAME"):
+    threading.Thread(target=_bootstrap, daemon=True).start()
+else:
+    _bootstrap_done.set()
+
+
+def is_retryable(status: int | None) -> bool:
+    return status is not None and (status == 429 or status >= 500)
+
+
+def reindex_document(doc_id: str | None, doc: dict) -> tuple[int | None, str] | None:
+    if doc_id is None:
+        method, doc_url = "POST", f"{ES_HOST}/{INDEX_NAME}/_doc"
+    else:
+        method, doc_url = "PUT", f"{ES_HOST}/{INDEX_NAME}/_doc/{doc_id}"
+
+    try:
+        response = SESSION.request(
+            method,
+            doc_url,
+            data=orjson.dumps(doc),
+            headers=JSON_HEADERS,
+            timeout=5
+        )
+        response.raise_for_status()
+    except requests.exceptions.HTTPError as e:
+        return e.response.status_code, e.response.text
+    except requests.exceptions.RequestException as e:
+        return None, str(e)
+
+    return None
+
+def ensure_bootstrapped():
+    _bootstrap_done.wait(timeout=BOOTSTRAP_TIMEOUT)
+    ensure_index_exists()
+
+
+def bulk_index(documents: list, auto_id: bool = False) -> None:
+    # Documents are keyed by icao24 so each aircraft's latest state replaces
+    # the previous one. auto_id lets Elasticsearch assign ids instead, which
+    # skips its per-write version lookup but keeps every state as a new document.
+    if auto_id:
+        doc_ids = [None] * len(documents)
+    else:
+        doc_ids = [doc["icao24"] for doc in documents]
+
+    bulk_body = b"".join(
+        (
+            AUTO_ID_ACTION if doc_id is None
+            else orjson.dumps({"index": {"_id": doc_id}}) + b"\n"
+        )
+        + orjson.dumps(doc) + b"\n"
+        for doc_id, doc in zip(doc_ids, documents)
+    )
+    bulk_url = f"{ES_HOST}/{INDEX_NAME}/_bulk"
+
+    try:
+        response = SESSION.post(
+            bulk_url,
+            data=gzip.compress(bulk_body, compresslevel=1),
+            headers=BULK_HEADERS,
+            timeout=10
+        )
+
+        response.raise_for_status()
+
+        response_data = response.json()
+
+    except requests.exceptions.HTTPError as e:
+        logger.error(
+            f"HTTP error bulk indexing {len(documents)} docs: {e.response.text}"
+        )
+        raise Exception(f"HTTP error: {e.response.text}")
+    except Exception as e:
+        logger.error(
+            f"An unexpected error occurred bulk indexing {len(documents)} docs: {e}",
+            exc_info=True
+        )
+        raise Exception(f"An unexpected error occurred: {e}")
+
+    failed = []
+    retry_ids = []
+    retry_docs = []
+
+    if response_data.get("errors"):
+        for doc_id, doc, item in zip(doc_ids, documents, response_data["items"]):
+            result = item["index"]
+            if "error" not in result:
+                continue
+
+            if is_retryable(result["status"]):
+                retry_ids.append(doc_id)
+                retry_docs.append(doc)
+            else:
+                logger.error(
+                    f"Failed to index document {doc['icao24']}: {result['error']}"
+                )
+                failed.append(doc["icao24"])
+
+    for attempt in range(RETRY_ROUNDS):
+        if not retry_docs:
+            break
+
+        # Back off with jitter so the retries do not hit the node that just
+        # rejected the batch all at once.
+        delay = RETRY_BACKOFF * 2 ** attempt
+        time.sleep(delay / 2 + random.uniform(0, delay / 2))
+
+        logger.warning(
+            f"Retrying {len(retry_docs)} rejected documents individually "
+            f"(attempt {attempt + 1} of {RETRY_ROUNDS})."
+        )
+
+        rejected_ids = []
+        rejected_docs = []
+        last_round = attempt + 1 == RETRY_ROUNDS
+        workers = min(MAX_RETRY_WORKERS, len(retry_docs))
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            errors = executor.map(reindex_document, retry_ids, retry_docs)
+            for doc_id, doc, error in zip(retry_ids, retry_docs, errors):
+                if error is None:
+                    continue
+
+                status, detail = error
+                if is_retryable(status) and not last_round:
+                    rejected_ids.append(doc_id)
+                    rejected_docs.append(doc)
+                else:
+                    logger.error(f"Failed to index document {doc['icao24']}: {detail}")
+                    failed.append(doc["icao24"])
+
+        retry_ids = rejected_ids
+        retry_docs = rejected_docs
+
+    if failed:
+        raise Exception(
+            f"Bulk indexing failed for {len(failed)} of {len(documents)} "
+            f"documents: {failed}"
+        )
@@ -0,0 +1,114 @@
+import logging
+from typing import Optional
+
+import msgspec
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger()
+
+API_URL = "https://opensky-network.org/api/states/all"
+MAX_FLIGHTS_TO_PROCESS = 50
+
+SESSION = requests.Session()
+SESSION.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=1,
+        max_retries=Retry(total=2, read=False, backoff_factor=0.1)
+    )
+)
+
+# Positional layout of a /states/all row, see
+# https://openskynetwork.github.io/opensky-api/rest.html#all-state-vectors
+# Columns the transform never reads are kept as msgspec.Raw, and the trailing
+# ones default to None, so an odd or missing unused cell cannot fail the fetch.
+class StateVector(msgspec.Struct, array_like=True):
+    icao24: str
+    callsign: Optional[str]
+    origin_country: Optional[str]
+    time_position: msgspec.Raw
+    last_contact: Optional[int]
+    longitude: Optional[float]
+    latitude: Optional[float]
+    baro_altitude: Optional[float]
+    on_ground: Optional[bool]
+    velocity: Optional[float]
+    true_track: Optional[float]
+    vertical_rate: Optional[float]
+    sensors: msgspec.Raw = None
+    geo_altitude: Optional[float] = None
+    squawk: msgspec.Raw = None
+    spi: msgspec.Raw = None
+    position_source: msgspec.Raw = None
+
+
+class StatesResponse(msgspec.Struct):
+    time: int
+    states: Optional[list[StateVector]] = None
+
+
+STATES_DECODER = msgspec.json.Decoder(StatesResponse)
+
+DOCUMENT_FIELDS = (
+    "icao24",
+    "callsign",
+    "origin_country",
+    "location",
+    "baro_altitude_m",
+    "on_ground",
+    "velocity_mps",
+    "true_track_deg",
+    "vertical_rate_mps",
+    "geo_altitude_m",
+    "last_contact",
+)
+
+def fetch_states() -> list[StateVector]:
+    logger.info("Fetching live flight data from OpenSky Network...")
+
+    try:
+        response = SESSION.get(API_URL, timeout=10)
+        response.raise_for_status()
+
+        data = STATES_DECODER.decode(response.content)
+
+    except requests.exceptions.Timeout as e:
+        logger.error(f"Request to OpenSky API timed out: {e}")
+        raise Exception("Request timed out")
+
+    except requests.exceptions.RequestException as e:
+        logger.error(f"API request failed: {e}")
+        raise Exception(f"API request failed: {e}")
+
+    except Exception as e:
+        logger.error(f"An unexpected error occurred: {e}", exc_info=True)
+        raise Exception(f"An unexpected error occurred: {e}")
+
+    states = data.states or []
+    if len(states) > MAX_FLIGHTS_TO_PROCESS:
+        logger.info(f"Reached limit of {MAX_FLIGHTS_TO_PROCESS} flights. Stopping.")
+        states = states[:MAX_FLIGHTS_TO_PROCESS]
+
+    return states
+
+
+def to_document(state: StateVector) -> dict:
+    return {
+        "icao24": state.icao24.strip() or None,
+        "callsign": state.callsign.strip() if state.callsign else None,
+        "origin_country": state.origin_country or None,
+        "location": (
+            {"lat": state.latitude, "lon": state.longitude}
+            if state.latitude is not None and state.longitude is not None else None
+        ),
+        "baro_altitude_m": state.baro_altitude,
+        "on_ground": bool(state.on_ground),
+        "velocity_mps": state.velocity,
+        "true_track_deg": state.true_track,
+        "vertical_rate_mps": state.vertical_rate,
+        "geo_altitude_m": state.geo_altitude,
+        "last_contact": state.last_contact,
+    }
@@ -0,0 +1,207 @@
+import base64
+import json
+from unittest import mock
+
+import pytest
+import requests
+
+from lambdas.common import es
+
+DOCUMENTS = [
+    {"icao24": "a8b72b", "callsign": "SWR100"},
+    {"icao24": "4ca7b5", "callsign": "BAW1"}
+]
+REJECTED = {"status": 429, "error": {"type": "es_rejected_execution_exception"}}
+UNAVAILABLE = {"status": 503, "error": {"type": "unavailable_shards_exception"}}
+DUPLICATE_DATA_VIEW = (
+    '{"statusCode":400,"error":"Bad Request","message":"Duplicate data view: flights"}'
+)
+
+@pytest.fixture(autouse=True)
+def mock_sleep():
+    with mock.patch('lambdas.common.es.time.sleep') as m:
+        yield m
+
+@mock.patch('lambdas.common.es.SESSION')
+def test_bulk_index_retries_rejected_items(mock_session, mock_response, bulk_result):
+    mock_session.request.return_value = mock_response(201)
+    mock_session.post.return_value = mock_response(200, bulk_result(
+        {"_id": "a8b72b", "status": 201, "result": "created"},
+        dict(REJECTED, _id="4ca7b5")
+    ))
+
+    es.bulk_index(DOCUMENTS)
+
+    retry_call = mock_session.request.call_args
+    assert retry_call[0] == ("PUT", "http://elasticsearch:9200/flights/_doc/4ca7b5")
+    assert retry_call[1]['headers']['Content-Type'] == "application/json"
+    assert json.loads(retry_call[1]['data'])['icao24'] == "4ca7b5"
+    mock_session.request.assert_called_once()
+
+@mock.patch('lambdas.common.es.SESSION')
+def test_bulk_index_retries_auto_id_items_with_post(
+    mock_session, mock_response, bulk_result
+):
+    mock_session.request.return_value = mock_response(201)
+    mock_session.post.return_value = mock_response(200, bulk_result(
+        UNAVAILABLE,
+        {"_id": "1", "status": 201, "result": "created"}
+    ))
+
+    es.bulk_index(DOCUMENTS, auto_id=True)
+
+    retry_call = mock_session.request.call_args
+    assert retry_call[0] == ("POST", "http://elasticsearch:9200/flights/_doc")
+    assert json.loads(retry_call[1]['data'])['icao24'] == "a8b72b"
+
+@mock.patch('lambdas.common.es.SESSION')
+def test_bulk_index_fails_when_retry_fails(mock_session, mock_response, bulk_result):
+    mock_session.request.return_value = mock_response(
+        503, text_data="Service Unavailable"
+    )
+    mock_session.post.return_value = mock_response(200, bulk_result(
+        dict(UNAVAILABLE, _id="a8b72b"),
+        {"_id": "4ca7b5", "status": 201, "result": "created"}
+    ))
+
+    with pytest.raises(Exception) as e:
+        es.bulk_index(DOCUMENTS)
+
+    assert "Bulk indexing failed for 1 of 2 documents" in str(e.value)
+    assert mock_session.request.call_count == es.RETRY_ROUNDS
+
+@mock.patch('lambdas.common.es.SESSION')
+def test_bulk_index_backs_off_between_retry_rounds(
+    mock_session, mock_sleep, mock_response, bulk_result
+):
+    mock_session.request.side_effect = [
+        mock_response(429, text_data="Too Many Requests"),
+        mock_response(503, text_data="Service Unavailable"),
+        mock_response(201)
+    ]
+    mock_session.post.return_value = mock_response(200, bulk_result(
+        dict(REJECTED, _id="a8b72b"),
+        {"_id": "4ca7b5", "status": 201, "result": "created"}
+    ))
+
+    es.bulk_index(DOCUMENTS)
+
+    assert mock_session.request.call_count == 3
+    delays = [c[0][0] for c in mock_sleep.call_args_list]
+    assert len(delays) == 3
+    for attempt, delay in enumerate(delays):
+        ceiling = es.RETRY_BACKOFF * 2 ** attempt
+        assert ceiling / 2 <= delay <= ceiling
+
+@mock.patch('lambdas.common.es.SESSION')
+def test_bulk_index_does_not_retry_non_retryable_errors(
+    mock_session, mock_sleep, mock_response, bulk_result
+):
+    mock_session.request.return_value = mock_response(
+        400, text_data="mapper_parsing_exception"
+    )
+    mock_session.post.return_value = mock_response(200, bulk_result(
+        {"_id": "a8b72b", "status": 400, "error": {"type": "mapper_parsing_exception"}},
+        dict(REJECTED, _id="4ca7b5")
+    ))
+
+    with pytest.raises(Exception) as e:
+        es.bulk_index(DOCUMENTS)
+
+    assert "Bulk indexing failed for 2 of 2 documents" in str(e.value)
+    mock_session.request.assert_called_once()
+    mock_sleep.assert_called_once()
+
+@mock.patch('lambdas.common.es.SESSION')
+def test_bootstrap_failure_is_retried_on_invocation(mock_session, mock_response):
+    mock_session.put.side_effect = [
+        requests.exceptions.ConnectionError("Test connection error"),
+        mock_response(200)
+    ]
+    mock_session.post.return_value = mock_response(200)
+
+    es._bootstrap()
+
+    assert es._bootstrap_done.is_set()
+    assert es._index_created is False
+
+    es.ensure_bootstrapped()
+
+    assert es._index_created is True
+    assert mock_session.put.call_count == 2
+
+@mock.patch('lambdas.common.es.SESSION')
+def test_bootstrap_creates_data_view(mock_session, mock_response):
+    mock_session.put.return_value = mock_response(200)
+    mock_session.post.return_value = mock_response(200)
+
+    es._bootstrap()
+
+    dataview_call = mock_session.post.call_args
+    assert dataview_call[0][0].endswith("/api/data_views/data_view")
+    assert json.loads(dataview_call[1]['data'])['data_view']['id'] == "flights"
+    assert dataview_call[1]['auth'] is es.KIBANA_AUTH
+    assert es._index_created is True
+    assert es._data_view_created is True
+
+@mock.patch('lambdas.common.es.SESSION')
+def test_kibana_timeout_does_not_block_indexing(
+    mock_session, mock_response, bulk_result
+):
+    mock_session.put.return_value = mock_response(200)
+    mock_session.post.side_effect = [
+        requests.exceptions.ReadTimeout("Kibana read timed out"),
+        mock_response(200, bulk_result(
+            {"_id": "a8b72b", "status": 201, "result": "created"},
+            {"_id": "4ca7b5", "status": 201, "result": "created"}
+        ))
+    ]
+
+    es._bootstrap()
+    es.ensure_bootstrapped()
+    es.bulk_index(DOCUMENTS)
+
+    assert mock_session.post.call_count == 2
+    assert mock_session.post.call_args[0][0].endswith("/flights/_bulk")
+
+@mock.patch('lambdas.common.es.SESSION')
+def test_ensure_bootstrapped_skips_data_view(mock_session, mock_response):
+    mock_session.put.return_value = mock_response(200)
+
+    es.ensure_bootstrapped()
+
+    assert es._index_created is True
+    mock_session.post.assert_not_called()
+
+@mock.patch('lambdas.common.es.SESSION')
+def test_existing_data_view(mock_session, mock_response):
+    mock_session.post.return_value = mock_response(400, text_data=DUPLICATE_DATA_VIEW)
+
+    es.ensure_data_view_exists()
+
+    assert es._data_view_created is True
+
+def test_session_sends_precomputed_auth_headers():
+    es_auth = es.SESSION.prepare_request(
+        requests.Request("POST", f"{es.ES_HOST}/flights/_bulk")
+    ).headers["Authorization"]
+    kibana_auth = es.SESSION.prepare_request(
+        requests.Request(
+            "POST", es.KIBANA_HOST, headers=es.KIBANA_HEADERS, auth=es.KIBANA_AUTH
+        )
+    ).headers["Authorization"]
+
+    assert es_auth == "Basic " + base64.b64encode(b"elastic:changeme").decode()
+    assert kibana_auth == (
+        "Basic " + base64.b64encode(b"kibana_user_test:newpassword").decode()
+    )
+    assert es.SESSION.trust_env is True
+
+def test_request_auth_overrides_session_auth():
+    auth = es.SESSION.prepare_request(
+        requests.Request(
+            "GET", f"{es.ES_HOST}/_cluster/health", auth=("reader", "secret")
+        )
+    ).headers["Authorization"]
+
+    assert auth == "Basic " + base64.b64encode(b"reader:secret").decode()
@@ -0,0 +1,55 @@
+import gzip
+import json
+from unittest import mock
+
+import pytest
+from requests.exceptions import HTTPError
+
+from lambdas.common import es
+
+
+@pytest.fixture(autouse=True)
+def reset_globals():
+    es._index_created = False
+    es._data_view_created = False
+
+
+@pytest.fixture
+def mock_response():
+    def _mock_response(status_code, json_data=None, text_data="", content=b""):
+        m = mock.Mock()
+        m.status_code = status_code
+        m.text = text_data
+        m.content = content
+        if json_data:
+            m.json.return_value = json_data
+
+        def raise_for_status():
+            if status_code >= 400:
+                mock_err_response = mock.Mock()
+                mock_err_response.status_code = status_code
+                mock_err_response.text = text_data
+                err = HTTPError()
+                err.response = mock_err_response
+                raise err
+        m.raise_for_status = raise_for_status
+        return m
+    return _mock_response
+
+
+@pytest.fixture
+def bulk_result():
+    def _bulk_result(*items):
+        return {
+            "errors": any("error" in item for item in items),
+            "items": [{"index": item} for item in items]
+        }
+    return _bulk_result
+
+
+@pytest.fixture
+def bulk_lines():
+    def _bulk_lines(bulk_call):
+        body = gzip.decompress(bulk_call[1]['data'])
+        return [json.loads(line) for line in body.splitlines()]
+    return _bulk_lines
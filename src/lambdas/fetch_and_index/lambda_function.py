@@ -0,0 +1,38 @@
+import logging
+
+import orjson
+
+from lambdas.common import es, opensky
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Fetches OpenSky state vectors and bulk-indexes them in one invocation, so
+# flight data never passes through Step Functions state.
+
+
+def handler(event: dict, context: object) -> dict:
+
+    # The OpenSky fetch does not need the index, so it runs while the
+    # bootstrap thread may still be finishing.
+    states = opensky.fetch_states()
+
+    es.ensure_bootstrapped()
+
+    documents = [doc for doc in map(opensky.to_document, states) if doc["icao24"]]
+
+    if not documents:
+        return {"statusCode": 200, "body": "Skipped (no flights)"}
+
+    es.bulk_index(documents, auto_id=bool(event.get("_auto_id")))
+
+    logger.info(f"Fetched and indexed {len(documents)} flights via bulk API.")
+
+    return {
+        "statusCode": 201,
+        "body": orjson.dumps({
+            "message": "Flights indexed successfully",
+            "indexed": len(documents),
+            "ids": [doc["icao24"] for doc in documents]
+        }).decode()
+    }
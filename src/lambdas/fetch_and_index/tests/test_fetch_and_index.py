@@ -0,0 +1,125 @@
+import json
+from unittest import mock
+
+import msgspec
+import pytest
+import requests
+
+from lambdas.common import es
+from lambdas.fetch_and_index import lambda_function
+
+MOCK_API_RESPONSE = {
+    "time": 1234567890,
+    "states": [
+        [
+            "abc123",
+            "TEST123 ",
+            "United States",
+            None,
+            1234567885,
+            -73.78,
+            40.64,
+            10000.0,
+            False,
+            250.0,
+            90.0,
+            0.0,
+            None,
+            10200.0,
+            None,
+            None,
+            None
+        ]
+    ]
+}
+MOCK_API_CONTENT = msgspec.json.encode(MOCK_API_RESPONSE)
+
+@mock.patch('lambdas.common.es.SESSION')
+@mock.patch('lambdas.common.opensky.SESSION')
+def test_handler_fetches_and_bulk_indexes(
+    mock_opensky, mock_session, mock_response, bulk_result, bulk_lines
+):
+    mock_opensky.get.return_value = mock_response(200, content=MOCK_API_CONTENT)
+    mock_session.put.return_value = mock_response(200)
+    mock_session.post.return_value = mock_response(
+        200, bulk_result({"_id": "abc123", "status": 201, "result": "created"})
+    )
+
+    result = lambda_function.handler({}, None)
+
+    assert result['statusCode'] == 201
+    assert json.loads(result['body'])['ids'] == ['abc123']
+
+    bulk_call = mock_session.post.call_args
+    assert bulk_call[0][0].endswith("/flights/_bulk")
+    action, doc = bulk_lines(bulk_call)
+
+    assert action == {"index": {"_id": "abc123"}}
+    assert doc == {
+        "icao24": "abc123",
+        "callsign": "TEST123",
+        "origin_country": "United States",
+        "location": {"lat": 40.64, "lon": -73.78},
+        "baro_altitude_m": 10000.0,
+        "on_ground": False,
+        "velocity_mps": 250.0,
+        "true_track_deg": 90.0,
+        "vertical_rate_mps": 0.0,
+        "geo_altitude_m": 10200.0,
+        "last_contact": 1234567885
+    }
+    assert es._index_created is True
+
+@mock.patch('lambdas.common.es.SESSION')
+@mock.patch('lambdas.common.opensky.SESSION')
+def test_handler_auto_id_opt_in(
+    mock_opensky, mock_session, mock_response, bulk_result, bulk_lines
+):
+    mock_opensky.get.return_value = mock_response(200, content=MOCK_API_CONTENT)
+    mock_session.post.return_value = mock_response(
+        200, bulk_result({"_id": "1", "status": 201, "result": "created"})
+    )
+
+    lambda_function.handler({"_auto_id": True}, None)
+
+    lines = bulk_lines(mock_session.post.call_args)
+    assert lines[0] == {"index": {}}
+    assert lines[1]['last_contact'] == 1234567885
+
+@mock.patch('lambdas.common.es.SESSION')
+@mock.patch('lambdas.common.opensky.SESSION')
+def test_handler_empty_states(mock_opensky, mock_session, mock_response):
+    mock_opensky.get.return_value = mock_response(
+        200, content=msgspec.json.encode({"time": 1234567890, "states": []})
+    )
+
+    result = lambda_function.handler({}, None)
+
+    assert result['statusCode'] == 200
+    assert not any(c[0][0].endswith("/_bulk") for c in mock_session.post.call_args_list)
+
+@mock.patch('lambdas.common.es.SESSION')
+@mock.patch('lambdas.common.opensky.SESSION')
+def test_handler_fetch_timeout(mock_opensky, mock_session):
+    mock_opensky.get.side_effect = requests.exceptions.Timeout("Request timed out")
+
+    with pytest.raises(Exception) as e:
+        lambda_function.handler({}, None)
+
+    assert "Request timed out" in str(e.value)
+    mock_session.post.assert_not_called()
+
+@mock.patch('lambdas.common.es.SESSION')
+@mock.patch('lambdas.common.opensky.SESSION')
+def test_handler_bulk_item_errors(
+    mock_opensky, mock_session, mock_response, bulk_result
+):
+    mock_opensky.get.return_value = mock_response(200, content=MOCK_API_CONTENT)
+    mock_session.post.return_value = mock_response(200, bulk_result(
+        {"_id": "abc123", "status": 400, "error": {"type": "mapper_parsing_exception"}}
+    ))
+
+    with pytest.raises(Exception) as e:
+        lambda_function.handler({}, None)
+
+    assert "Bulk indexing failed for 1 of 1 documents" in str(e.value)
@@ -1,5 +1,7 @@
+import msgspec
 import pytest
 from unittest.mock import patch, Mock
+from lambdas.common.opensky import MAX_FLIGHTS_TO_PROCESS
 from lambdas.fetch_flight_list.lambda_function import handler
 import requests
 
@@ -29,10 +31,10 @@ MOCK_API_RESPONSE = {
 }
 
 
-@patch("lambdas.fetch_flight_list.lambda_function.requests.get")
+@patch("lambdas.common.opensky.SESSION.get")
 def test_handler_success(mock_get):
     mock_response = Mock()
-    mock_response.json.return_value = MOCK_API_RESPONSE
+    mock_response.content = msgspec.json.encode(MOCK_API_RESPONSE)
     mock_response.raise_for_status.return_value = None
     mock_get.return_value = mock_response
 
@@ -40,13 +42,12 @@ def test_handler_success(mock_get):
     context = {}
 
     result = handler(event, context)
-    assert isinstance(result, list)
-    assert len(result) == 1
-    flight = result[0]
+    assert isinstance(result, dict)
+    assert result["icao24"] == ["abc123"]
+    flight = {field: column[0] for field, column in result.items()}
     assert flight["callsign"] == "TEST123"
     assert flight["origin_country"] == "United States"
-    assert flight["longitude"] == -73.78
-    assert flight["latitude"] == 40.64
+    assert flight["location"] == {"lat": 40.64, "lon": -73.78}
     assert flight["baro_altitude_m"] == 10000.0
     assert flight["on_ground"] is False
     assert flight["velocity_mps"] == 250.0
@@ -55,7 +56,7 @@ def test_handler_success(mock_get):
     assert flight["geo_altitude_m"] == 10200.0
 
 
-@patch("lambdas.fetch_flight_list.lambda_function.requests.get")
+@patch("lambdas.common.opensky.SESSION.get")
 def test_handler_timeout(mock_get):
     mock_get.side_effect = requests.exceptions.Timeout("Request timed out")
     event = {}
@@ -66,7 +67,7 @@ def test_handler_timeout(mock_get):
     assert "Request timed out" in str(excinfo.value)
 
 
-@patch("lambdas.fetch_flight_list.lambda_function.requests.get")
+@patch("lambdas.common.opensky.SESSION.get")
 def test_handler_api_error(mock_get):
     mock_response = Mock()
     mock_response.raise_for_status.side_effect = requests.exceptions.RequestException("API error")
@@ -79,10 +80,10 @@ def test_handler_api_error(mock_get):
     assert "API request failed" in str(excinfo.value)
 
 
-@patch("lambdas.fetch_flight_list.lambda_function.requests.get")
+@patch("lambdas.common.opensky.SESSION.get")
 def test_handler_empty_states(mock_get):
     mock_response = Mock()
-    mock_response.json.return_value = {"time": 1234567890, "states": []}
+    mock_response.content = msgspec.json.encode({"time": 1234567890, "states": []})
     mock_response.raise_for_status.return_value = None
     mock_get.return_value = mock_response
 
@@ -90,4 +91,75 @@ def test_handler_empty_states(mock_get):
     context = {}
 
     result = handler(event, context)
-    assert result == []
\ No newline at end of file
+    assert all(column == [] for column in result.values())
+
+
+@patch("lambdas.common.opensky.SESSION.get")
+def test_handler_limits_flights(mock_get):
+    states = MOCK_API_RESPONSE["states"] * (MAX_FLIGHTS_TO_PROCESS + 5)
+    mock_response = Mock()
+    mock_response.content = msgspec.json.encode({"time": 1234567890, "states": states})
+    mock_response.raise_for_status.return_value = None
+    mock_get.return_value = mock_response
+
+    result = handler({}, {})
+    assert all(len(column) == MAX_FLIGHTS_TO_PROCESS for column in result.values())
+
+
+@patch("lambdas.common.opensky.SESSION.get")
+def test_handler_extended_state_vector(mock_get):
+    state = MOCK_API_RESPONSE["states"][0] + [2]
+    mock_response = Mock()
+    mock_response.content = msgspec.json.encode({"time": 1234567890, "states": [state]})
+    mock_response.raise_for_status.return_value = None
+    mock_get.return_value = mock_response
+
+    result = handler({}, {})
+    assert result["icao24"] == ["abc123"]
+    assert result["geo_altitude_m"] == [10200.0]
+
+
+@patch("lambdas.common.opensky.SESSION.get")
+def test_handler_null_states(mock_get):
+    mock_response = Mock()
+    mock_response.content = b'{"time": 1234567890, "states": null}'
+    mock_response.raise_for_status.return_value = None
+    mock_get.return_value = mock_response
+
+    assert all(column == [] for column in handler({}, {}).values())
+
+
+@patch("lambdas.common.opensky.SESSION.get")
+def test_handler_keeps_zero_values(mock_get):
+    state = ["abc123", "TEST123 ", "United Kingdom", None, None,
+             0.0, 51.47, 0.0, True, 0.0, 0.0, 0.0, None, None, None, False, 0]
+    mock_response = Mock()
+    mock_response.content = msgspec.json.encode({"time": 1234567890, "states": [state]})
+    mock_response.raise_for_status.return_value = None
+    mock_get.return_value = mock_response
+
+    flight = {field: column[0] for field, column in handler({}, {}).items()}
+    assert flight["location"] == {"lat": 51.47, "lon": 0.0}
+    assert flight["baro_altitude_m"] == 0.0
+    assert flight["velocity_mps"] == 0.0
+    assert flight["true_track_deg"] == 0.0
+    assert flight["vertical_rate_mps"] == 0.0
+    assert flight["geo_altitude_m"] is None
+
+
+@patch("lambdas.common.opensky.SESSION.get")
+def test_handler_tolerates_short_rows_and_odd_unused_cells(mock_get):
+    short = MOCK_API_RESPONSE["states"][0][:14]
+    odd = ["def456"] + MOCK_API_RESPONSE["states"][0][1:12]
+    odd += ["17", 10200.0, 7700, "no", "ADSB"]
+    odd[3] = {"unexpected": True}
+    mock_response = Mock()
+    mock_response.content = msgspec.json.encode(
+        {"time": 1234567890, "states": [short, odd]}
+    )
+    mock_response.raise_for_status.return_value = None
+    mock_get.return_value = mock_response
+
+    result = handler({}, {})
+    assert result["icao24"] == ["abc123", "def456"]
+    assert result["geo_altitude_m"] == [10200.0, 10200.0]
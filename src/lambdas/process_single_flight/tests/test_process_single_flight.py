@@ -4,118 +4,171 @@ from unittest import mock
 import requests
 from requests.exceptions import ConnectionError, HTTPError
 
+from lambdas.common import es
 from lambdas.process_single_flight import lambda_function
 
-@pytest.fixture(autouse=True)
-def reset_globals():
-    lambda_function._index_created = False
-    lambda_function._data_view_created = False
-
 @pytest.fixture
 def sample_payload():
     return {
       "icao24": "a8b72b",
       "callsign": "SWR100  ",
       "origin_country": "Switzerland",
-      "longitude": 8.5393,
-      "latitude": 47.4583,
+      "location": {"lat": 47.4583, "lon": 8.5393},
       "baro_altitude_m": 1234.5,
       "on_ground": False,
       "velocity_mps": 100.2,
       "true_track_deg": 45.1,
       "vertical_rate_mps": 0,
-      "geo_altitude_m": 1300
+      "geo_altitude_m": 1300,
+      "last_contact": 1712345678
     }
 
-@pytest.fixture
-def mock_response():
-    def _mock_response(status_code, json_data=None, text_data=""):
-        m = mock.Mock()
-        m.status_code = status_code
-        m.text = text_data
-        if json_data:
-            m.json.return_value = json_data
-        
-        def raise_for_status():
-            if status_code >= 400:
-                mock_err_response = mock.Mock()
-                mock_err_response.text = text_data
-                err = HTTPError()
-                err.response = mock_err_response
-                raise err
-        m.raise_for_status = raise_for_status
-        return m
-    return _mock_response
-
-@mock.patch('lambdas.process_single_flight.lambda_function.requests')
-def test_handler_success_new_index_and_dataview(mock_requests, sample_payload, mock_response):
-    mock_requests.exceptions = requests.exceptions
-    
-    mock_requests.head.return_value = mock_response(404)
-    
-    mock_requests.put.side_effect = [
-        mock_response(200),
-        mock_response(201, {"result": "created"})
-    ]
-    
-    mock_requests.get.return_value = mock_response(404)
-    mock_requests.post.return_value = mock_response(200)
+@mock.patch('lambdas.common.es.SESSION')
+def test_handler_success_new_index(
+    mock_session, sample_payload, mock_response, bulk_result, bulk_lines
+):
+    mock_session.put.return_value = mock_response(200)
+    mock_session.post.return_value = mock_response(
+        200, bulk_result({"_id": "a8b72b", "status": 201, "result": "created"})
+    )
 
     result = lambda_function.handler(sample_payload, None)
     
     assert result['statusCode'] == 201
-    assert json.loads(result['body'])['result'] == 'created'
+    assert json.loads(result['body'])['ids'] == ['a8b72b']
     
-    es_put_call = mock_requests.put.call_args_list[1]
-    es_put_url = es_put_call[0][0]
-    es_put_json = es_put_call[1]['json']
+    create_call = mock_session.put.call_args
+    assert create_call[0][0].endswith("/flights")
+    index_body = json.loads(create_call[1]['data'])
+    assert index_body['settings']['index.translog.durability'] == "async"
+    assert index_body['mappings']['properties']['last_contact'] == {
+        "type": "date", "format": "epoch_second"
+    }
+
+    bulk_call = mock_session.post.call_args
+    bulk_url = bulk_call[0][0]
+    action, doc = bulk_lines(bulk_call)
     
-    assert es_put_url.endswith(f"/_doc/{sample_payload['icao24']}")
-    assert es_put_json['location'] == {"lat": 47.4583, "lon": 8.5393} 
-    assert 'latitude' not in es_put_json
+    assert bulk_url.endswith("/flights/_bulk")
+    assert bulk_call[1]['headers']['Content-Type'] == "application/x-ndjson"
+    assert bulk_call[1]['headers']['Content-Encoding'] == "gzip"
+    assert action == {"index": {"_id": "a8b72b"}}
+    assert doc == sample_payload
     
-    mock_requests.post.assert_called_once()
-    assert mock_requests.put.call_count == 2
-    assert lambda_function._index_created is True
-    assert lambda_function._data_view_created is True
-
-@mock.patch('lambdas.process_single_flight.lambda_function.requests')
-def test_handler_success_existing_index_and_dataview(mock_requests, sample_payload, mock_response):
-    mock_requests.exceptions = requests.exceptions
-
-    mock_requests.head.return_value = mock_response(200)
-    mock_requests.get.return_value = mock_response(200)
-    mock_requests.put.return_value = mock_response(201, {"result": "updated"})
+    mock_session.post.assert_called_once()
+    mock_session.put.assert_called_once()
+    assert es._index_created is True
+
+@mock.patch('lambdas.common.es.SESSION')
+def test_handler_success_existing_index(
+    mock_session, sample_payload, mock_response, bulk_result
+):
+    mock_session.put.return_value = mock_response(
+        400, text_data='{"error":{"type":"resource_already_exists_exception"}}'
+    )
+    mock_session.post.return_value = mock_response(
+        200, bulk_result({"_id": "a8b72b", "status": 200, "result": "updated"})
+    )
 
     result = lambda_function.handler(sample_payload, None)
 
     assert result['statusCode'] == 201
-    assert json.loads(result['body'])['result'] == 'updated'
+    assert json.loads(result['body'])['indexed'] == 1
     
-    mock_requests.head.assert_called_once()
-    mock_requests.get.assert_called_once()
-    mock_requests.put.assert_called_once()
-    assert lambda_function._index_created is True
-    assert lambda_function._data_view_created is True
+    mock_session.post.assert_called_once()
+    mock_session.put.assert_called_once()
+    mock_session.head.assert_not_called()
+    mock_session.get.assert_not_called()
+    assert es._index_created is True
+
+@mock.patch('lambdas.common.es.SESSION')
+def test_handler_batch(
+    mock_session, sample_payload, mock_response, bulk_result, bulk_lines
+):
+    mock_session.post.return_value = mock_response(200, bulk_result(
+        {"_id": "a8b72b", "status": 201, "result": "created"},
+        {"_id": "4ca7b5", "status": 201, "result": "created"}
+    ))
+
+    second = dict(sample_payload, icao24="4ca7b5")
+    skipped = dict(sample_payload, icao24=None)
+    result = lambda_function.handler([sample_payload, skipped, second], None)
 
-@mock.patch('lambdas.process_single_flight.lambda_function.requests')
-def test_handler_no_icao24(mock_requests, sample_payload):
-    mock_requests.exceptions = requests.exceptions
+    assert result['statusCode'] == 201
+    assert json.loads(result['body'])['ids'] == ['a8b72b', '4ca7b5']
+
+    lines = bulk_lines(mock_session.post.call_args)
+    assert len(lines) == 4
+    assert lines[0] == {"index": {"_id": "a8b72b"}}
+    assert lines[2] == {"index": {"_id": "4ca7b5"}}
+
+@mock.patch('lambdas.common.es.SESSION')
+def test_handler_columnar_batch(
+    mock_session, sample_payload, mock_response, bulk_result, bulk_lines
+):
+    mock_session.post.return_value = mock_response(200, bulk_result(
+        {"_id": "1", "status": 201, "result": "created"},
+        {"_id": "2", "status": 201, "result": "created"}
+    ))
+
+    second = dict(sample_payload, icao24="4ca7b5", callsign="BAW1")
+    columns = {field: [sample_payload[field], second[field]] for field in second}
+    result = lambda_function.handler(columns, None)
+
+    assert json.loads(result['body'])['ids'] == ['a8b72b', '4ca7b5']
+
+    lines = bulk_lines(mock_session.post.call_args)
+    assert lines[1] == sample_payload
+    assert lines[3] == second
+
+@mock.patch('lambdas.common.es.SESSION')
+def test_handler_columnar_batch_auto_id(
+    mock_session, sample_payload, mock_response, bulk_result, bulk_lines
+):
+    mock_session.post.return_value = mock_response(200, bulk_result(
+        {"_id": "1", "status": 201, "result": "created"},
+        {"_id": "2", "status": 201, "result": "created"}
+    ))
+
+    second = dict(sample_payload, icao24="4ca7b5")
+    columns = {field: [sample_payload[field], second[field]] for field in second}
+    event = dict(columns, _auto_id=True)
+    result = lambda_function.handler(event, None)
+
+    assert json.loads(result['body'])['ids'] == ['a8b72b', '4ca7b5']
+    assert event == dict(columns, _auto_id=True)
+
+    lines = bulk_lines(mock_session.post.call_args)
+    assert lines[0] == {"index": {}}
+    assert lines[1] == sample_payload
+    assert lines[2] == {"index": {}}
+    assert lines[3] == second
+
+@mock.patch('lambdas.common.es.SESSION')
+def test_handler_bulk_item_errors(
+    mock_session, sample_payload, mock_response, bulk_result
+):
+    mock_session.post.return_value = mock_response(200, bulk_result(
+        {"_id": "a8b72b", "status": 400, "error": {"type": "mapper_parsing_exception"}}
+    ))
 
+    with pytest.raises(Exception) as e:
+        lambda_function.handler(sample_payload, None)
+
+    assert "Bulk indexing failed for 1 of 1 documents" in str(e.value)
+
+@mock.patch('lambdas.common.es.SESSION')
+def test_handler_no_icao24(mock_session, sample_payload):
     del sample_payload['icao24']
     result = lambda_function.handler(sample_payload, None)
     
     assert result['statusCode'] == 200
     assert 'Skipped' in result['body']
-    mock_requests.put.assert_not_called()
-
-@mock.patch('lambdas.process_single_flight.lambda_function.requests')
-def test_handler_es_index_fail(mock_requests, sample_payload, mock_response):
-    mock_requests.exceptions = requests.exceptions
+    assert not any(c[0][0].endswith("/_bulk") for c in mock_session.post.call_args_list)
 
-    mock_requests.head.return_value = mock_response(200)
-    mock_requests.get.return_value = mock_response(200)
-    mock_requests.put.return_value = mock_response(500, text_data="Internal Server Error")
+@mock.patch('lambdas.common.es.SESSION')
+def test_handler_es_index_fail(mock_session, sample_payload, mock_response):
+    mock_session.post.return_value = mock_response(500, text_data="Internal Server Error")
 
     with pytest.raises(Exception) as e:
         lambda_function.handler(sample_payload, None)
@@ -123,12 +176,11 @@ def test_handler_es_index_fail(mock_requests, sample_payload, mock_response):
     assert "HTTP error" in str(e.value)
     assert "Internal Server Error" in str(e.value)
 
-@mock.patch('lambdas.process_single_flight.lambda_function.requests')
-def test_handler_es_connection_error(mock_requests, sample_payload):
-    mock_requests.exceptions = requests.exceptions
-    mock_requests.head.side_effect = requests.exceptions.ConnectionError("Test connection error")
+@mock.patch('lambdas.common.es.SESSION')
+def test_handler_es_connection_error(mock_session, sample_payload):
+    mock_session.put.side_effect = requests.exceptions.ConnectionError("Test connection error")
 
     with pytest.raises(Exception) as e:
         lambda_function.handler(sample_payload, None)
     
-    assert "Connection error" in str(e.value)
\ No newline at end of file
+    assert "Connection error" in str(e.value)